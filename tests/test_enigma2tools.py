@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+"""
+Enigma2 service references tests
+"""
+import unittest
+from zvdrtools.enigma2tools import get_enigma2_channels_refs, get_enigma2_service_reference
+from zvdrtools.vdrtools import extract_channel_data
+
+#channels.conf line, service reference calculated by the original per-channel (Decimal based) implementation
+CHANNELS_REFS = [
+    ('1+1;Kyivstar:11766:HC34M2S0:S4.8E:27500:1001=2:1002:0:0:101:1:2:0', '1:0:1:65:2:1:302df6:0:0:0'),
+    ('Das Erste HD;ARD:11494:HC23M5O35P0S1:S19.2E:22000:5101=27:5102:0:0:10301:1:1019:0',
+     '1:0:1:283d:3fb:1:c00000:0:0:0'),
+    #radio
+    ('Radio Roks;SES:11766:VC34M2S0:S4.8E:27500:0:1012:0:0:103:1:2:0', '1:0:2:67:2:1:30adf6:0:0:0'),
+    #invalid ONIDs
+    ('Invalid ONID;Test:12073:HC34M2S0:S13.0E:27500:101=2:102:0:0:5:0:0:0', '1:0:1:5:0:0:822f29:0:0:0'),
+    ('ONID 1111;Test:10971:VC34M2S0:S28.2E:27500:101=2:102:0:0:6:4369:100:0', '1:0:1:6:64:1111:11aaadb:0:0:0'),
+    ('Sky wrong sat;Test:11426:HC23M5O35S0:S28.2E:27500:101=2:102:0:0:7:1:1011:0', '1:0:1:7:3f3:1:11a2ca2:0:0:0'),
+    #west
+    ('Thor;Telenor:10872:VC78M2S0:S0.8W:25000:101=2:102:0:0:8:70:13:0', '1:0:1:8:d:46:e080000:0:0:0'),
+    ('Thor radio;Telenor:11216:HC78M2S0:S1W:25000:0:102:0:0:9:70:13:0', '1:0:2:9:d:46:e060000:0:0:0'),
+    #cable and terrestrial
+    ('Cable;Cab:346000:M256:C:6900:101=2:102:0:0:10:0:0:0', '1:0:1:a:0:0:ffff0000:0:0:0'),
+    ('Terrestrial;DVB-T:538000:B8C23D12G8M16S0T8Y0:T:27500:101=2:102:0:0:11:8468:1:0',
+     '1:0:1:b:1:2114:eeee0000:0:0:0'),
+]
+
+
+def get_ocram_id(service_ref):
+    """
+    ocram channel ID from service reference (like this: 1:0:1:5:14:1:de82a36:0:0:0 -> tv.5_14_1_DE82A36)
+    """
+    service_ref_parts = service_ref.split(':')
+    service_type = 'radio' if service_ref_parts[2] == '2' else 'tv'
+    return '%s.%s' % (service_type, '_'.join(service_ref_parts[3:-3]).upper())
+
+
+class Enigma2ChannelsRefsTest(unittest.TestCase):
+    def setUp(self):
+        self.channels = [extract_channel_data(channel_line) for channel_line, service_ref in CHANNELS_REFS]
+        self.channels_refs = get_enigma2_channels_refs(self.channels)
+
+    def test_service_refs(self):
+        self.assertEqual(self.channels_refs.service_refs, [service_ref for channel_line, service_ref in CHANNELS_REFS])
+
+    def test_single_channel_reference(self):
+        self.assertEqual([get_enigma2_service_reference(channel) for channel in self.channels],
+                         self.channels_refs.service_refs)
+
+    def test_ocram_ids(self):
+        self.assertEqual(self.channels_refs.ocram_ids,
+                         [get_ocram_id(service_ref) for service_ref in self.channels_refs.service_refs])
+
+    def test_reverse_indexes(self):
+        channels_refs = get_enigma2_channels_refs(self.channels + self.channels[:1])
+        self.assertEqual(channels_refs.by_service_ref[CHANNELS_REFS[0][1]], [self.channels[0], self.channels[0]])
+        self.assertEqual(channels_refs.by_ocram_id['tv.A_0_0_FFFF0000'], [self.channels[8]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# -*- coding: utf8 -*-
+"""
+Track CLI import-time regressions: short commands shouldn't import XMLTV and mapping tools.
+Heavy modules add only about ten milliseconds to a few tens of milliseconds start, too little for a stable
+timing check, so the set of imported modules is the regression guard.
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('xmltv', 'ConfigParser', 'decimal', 'xml.etree')
+
+RUN_COMMAND_SCRIPT = '''
+import sys
+from zvdrtools.cli import main
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+sys.stderr.write(' '.join(sorted(sys.modules)))
+'''
+
+
+class ImportTimeTest(unittest.TestCase):
+    def run_command(self, *args):
+        process = subprocess.Popen([sys.executable, '-c', RUN_COMMAND_SCRIPT] + list(args), cwd=REPO_DIR,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = process.communicate()
+        self.assertEqual(process.returncode, 0, err)
+        return set(err.split())
+
+    def test_svdrpsend_help(self):
+        modules = self.run_command('svdrpsend', '--help')
+        self.assertIn('zvdrtools.svdrpsend', modules)
+        for module_name in HEAVY_MODULES:
+            self.assertNotIn(module_name, modules)
+
+    def test_python_m_entry_point(self):
+        process = subprocess.Popen([sys.executable, '-m', 'zvdrtools', 'svdrpsend', '--help'], cwd=REPO_DIR,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = process.communicate()
+        self.assertEqual(process.returncode, 0, err)
+        self.assertIn('zvdrtools svdrpsend', out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# -*- coding: utf8 -*-
+"""
+Bounded memory pipeline tests
+"""
+import gc
+import threading
+import time
+import unittest
+from zvdrtools.pipeline import bounded_iter, checked_iter, MemoryBudget, MemoryBudgetExceeded, SpoolFile, \
+    PUT_TIMEOUT
+
+STOP_WAIT = PUT_TIMEOUT * 4
+
+
+class FakeMemoryBudget(object):
+    def __init__(self, exceeded=False, fail=False):
+        self.exceeded = exceeded
+        self.fail = fail
+        self.checks_count = 0
+
+    def is_exceeded(self):
+        return self.exceeded
+
+    def check(self):
+        self.checks_count += 1
+        if self.fail:
+            raise MemoryBudgetExceeded('test budget')
+
+
+class BoundedIterTest(unittest.TestCase):
+    def get_producers(self, name):
+        return [thread for thread in threading.enumerate() if thread.name == name]
+
+    def wait_producers(self, name):
+        deadline = time.time() + STOP_WAIT
+        while self.get_producers(name) and time.time() < deadline:
+            time.sleep(0.05)
+        return self.get_producers(name)
+
+    def test_items_order(self):
+        self.assertEqual(list(bounded_iter(xrange(1000), 10, name='order')), range(1000))
+
+    def test_exception_propagation(self):
+        def failing_source():
+            yield 1
+            yield 2
+            raise IOError('broken feed')
+
+        items = []
+        with self.assertRaises(IOError):
+            for item in bounded_iter(failing_source(), 10, name='failing'):
+                items.append(item)
+        self.assertEqual(items, [1, 2])
+        self.assertEqual(self.wait_producers('failing'), [])
+
+    def test_early_stop(self):
+        closed = []
+
+        def endless_source():
+            try:
+                while True:
+                    yield 1
+            finally:
+                closed.append(True)
+
+        for i in range(3):
+            items = bounded_iter(endless_source(), 5, name='abandoned')
+            next(items)
+            del items
+            gc.collect()
+        self.assertEqual(self.wait_producers('abandoned'), [])
+        self.assertEqual(closed, [True] * 3)
+
+    def test_explicit_close(self):
+        items = bounded_iter(xrange(100000), 5, name='closed')
+        next(items)
+        items.close()
+        self.assertEqual(self.wait_producers('closed'), [])
+
+    def test_throttled_producer(self):
+        memory_budget = FakeMemoryBudget(exceeded=True)
+        self.assertEqual(list(bounded_iter(xrange(500), 10, memory_budget, 'throttled')), range(500))
+        self.assertTrue(memory_budget.checks_count > 0)
+
+    def test_consumer_budget_check(self):
+        memory_budget = FakeMemoryBudget(fail=True)
+        with self.assertRaises(MemoryBudgetExceeded):
+            list(bounded_iter(xrange(500), 10, memory_budget, 'exceeded'))
+        self.assertEqual(self.wait_producers('exceeded'), [])
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    def test_check(self):
+        MemoryBudget(1 << 40).check()
+        self.assertRaises(MemoryBudgetExceeded, MemoryBudget(1).check)
+        self.assertRaises(MemoryBudgetExceeded, list, checked_iter(xrange(1000), MemoryBudget(1)))
+
+
+class SpoolFileTest(unittest.TestCase):
+    def test_records(self):
+        spool = SpoolFile()
+        try:
+            records = [{'channel': 'a', 'title': [(u'Новини', u'uk')]}, (1, 2), u'text']
+            offsets = [spool.append(record) for record in records]
+            self.assertEqual([spool.read(offset) for offset in reversed(offsets)], list(reversed(records)))
+        finally:
+            spool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
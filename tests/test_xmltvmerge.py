@@ -0,0 +1,123 @@
+# -*- coding: utf8 -*-
+"""
+XMLTV feeds merge tests
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from zvdrtools.epg.xmltvmerge import merge_tv_schedules, merge_tv_schedules_by_channel, read_xmltv_feeds_priorities
+
+
+def make_programme(channel, start, stop, title):
+    return {'channel': channel, 'start_timestamp': start, 'stop_timestamp': stop, 'title': [(title, u'')]}
+
+
+def make_schedule(channels, hours, title_prefix):
+    """
+    Hourly programmes grouped by channel
+    """
+    return [make_programme(channel, hour * 3600, (hour + 1) * 3600, '%s %s %d' % (title_prefix, channel, hour))
+            for channel in channels for hour in hours]
+
+
+def get_feed_priority(channel_name, feed_index):
+    return feed_index
+
+
+def get_titles(programmes):
+    return [(prg['channel'], prg['title'][0][0]) for prg in programmes]
+
+
+class MergeTvSchedulesTest(unittest.TestCase):
+    def test_higher_priority_wins(self):
+        national = [make_programme('a', 0, 3600, 'n0'), make_programme('a', 3600, 7200, 'n1')]
+        regional = [make_programme('a', 1800, 5400, 'r0'), make_programme('a', 7200, 9000, 'r1')]
+        merged = list(merge_tv_schedules([iter(national), iter(regional)], get_feed_priority))
+        self.assertEqual(get_titles(merged), [('a', 'n0'), ('a', 'n1'), ('a', 'r1')])
+
+    def test_later_higher_priority_drops_window(self):
+        regional = [make_programme('a', 0, 3600, 'r0'), make_programme('a', 3600, 7200, 'r1')]
+        national = [make_programme('a', 1800, 7200, 'n0')]
+        merged = list(merge_tv_schedules([iter(national), iter(regional)], get_feed_priority))
+        self.assertEqual(get_titles(merged), [('a', 'n0')])
+
+    def test_per_channel_priority(self):
+        first = make_schedule(['a', 'b'], [0], 'first')
+        second = make_schedule(['a', 'b'], [0], 'second')
+        get_priority = lambda channel_name, feed_index: 1 - feed_index if channel_name == 'b' else feed_index
+        merged = list(merge_tv_schedules([iter(sorted(first, key=lambda prg: prg['start_timestamp'])),
+                                          iter(sorted(second, key=lambda prg: prg['start_timestamp']))],
+                                         get_priority))
+        self.assertEqual(sorted(get_titles(merged)), [('a', 'first a 0'), ('b', 'second b 0')])
+
+    def test_same_priority_overlaps_kept(self):
+        feed = [make_programme('a', 0, 3600, 'p0'), make_programme('a', 1800, 5400, 'p1')]
+        merged = list(merge_tv_schedules([iter(feed)], get_feed_priority))
+        self.assertEqual(get_titles(merged), [('a', 'p0'), ('a', 'p1')])
+
+
+class MergeTvSchedulesByChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def merge(self, schedules, get_priority=get_feed_priority):
+        return list(merge_tv_schedules_by_channel([iter(schedule) for schedule in schedules], get_priority,
+                                                  self.spool_dir))
+
+    def test_channel_grouped_feeds(self):
+        channels = ['c%02d' % i for i in range(20)]
+        national = make_schedule(channels, range(3), 'nat')
+        regional = make_schedule(list(reversed(channels)), range(2), 'reg')
+        get_priority = lambda channel_name, feed_index: 1 - feed_index if channel_name == 'c05' else feed_index
+        merged = self.merge([national, regional], get_priority)
+        expected = []
+        for channel in channels:
+            if channel == 'c05':
+                expected += [(channel, 'reg c05 0'), (channel, 'reg c05 1'), (channel, 'nat c05 2')]
+            else:
+                expected += [(channel, 'nat %s %d' % (channel, hour)) for hour in range(3)]
+        self.assertEqual(get_titles(merged), expected)
+
+    def test_unsorted_feeds(self):
+        national = make_schedule(['a', 'b'], range(24), 'nat')
+        regional = make_schedule(['b', 'a'], range(12, 36), 'reg')
+        random.Random(1).shuffle(national)
+        random.Random(2).shuffle(regional)
+        merged = self.merge([national, regional])
+        self.assertEqual(get_titles(merged),
+                         [('a', 'nat a %d' % hour) for hour in range(24)] +
+                         [('a', 'reg a %d' % hour) for hour in range(24, 36)] +
+                         [('b', 'nat b %d' % hour) for hour in range(24)] +
+                         [('b', 'reg b %d' % hour) for hour in range(24, 36)])
+
+    def test_programmes_are_restored(self):
+        prg = make_programme('a', 0, 3600, u'Новини')
+        prg['desc'] = [(u'опис', u'uk')]
+        self.assertEqual(self.merge([[prg], []]), [prg])
+
+    def test_spool_is_removed(self):
+        self.merge([make_schedule(['a'], range(3), 'nat')])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+
+class ReadXmltvFeedsPrioritiesTest(unittest.TestCase):
+    def test_priorities(self):
+        config_file = tempfile.NamedTemporaryFile(suffix='.ini', delete=False)
+        try:
+            config_file.write('[Priorities]\nb.ua = regional.xml.gz, national.xml.gz\n')
+            config_file.close()
+            get_priority = read_xmltv_feeds_priorities(config_file.name, ['/tmp/national.xml.gz',
+                                                                          '/tmp/regional.xml.gz'])
+        finally:
+            os.remove(config_file.name)
+        self.assertLess(get_priority('a.ua', 0), get_priority('a.ua', 1))
+        self.assertLess(get_priority('b.ua', 1), get_priority('b.ua', 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,3 @@
+from zvdrtools.cli import main
+
+main()
@@ -0,0 +1,37 @@
+# -*- coding: utf8 -*-
+"""
+zvdrtools command line entry point: python -m zvdrtools <command> [options]...
+Command modules are imported on demand, so short commands (like svdrpsend LSTT)
+don't pay for XMLTV and mapping tools imports.
+"""
+import sys
+
+COMMANDS = (
+    ('svdrpsend', 'zvdrtools.svdrpsend', 'send command to VDR with the Simple VDR Protocol (SVDRP)'),
+    ('import-xmltv', 'zvdrtools.commands.import_xmltv', 'import tv schedule in XMLTV to VDR EPG'),
+    ('make-mapping', 'zvdrtools.commands.make_channel_mapping', 'generate XMLTV to VDR channels mappings'),
+    ('ocram-logos', 'zvdrtools.commands.process_ocram_logos', "process ocram's picons.sh file"),
+    ('vdr-ids', 'zvdrtools.commands.get_vdr_ids', 'show VDR channels ID'),
+)
+
+
+def print_usage(out):
+    out.write('usage: zvdrtools <command> [options]...\n\ncommands:\n')
+    for name, module_name, help_str in COMMANDS:
+        out.write('  %-14s%s\n' % (name, help_str))
+    out.write('\nUse "zvdrtools <command> --help" to view command options.\n')
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print_usage(sys.stdout)
+        return
+    commands = dict((name, module_name) for name, module_name, help_str in COMMANDS)
+    if args[0] not in commands:
+        sys.stderr.write('zvdrtools: unknown command <%s>\n\n' % args[0])
+        print_usage(sys.stderr)
+        sys.exit(2)
+    command_module = __import__(commands[args[0]], fromlist=['main'])
+    command_module.main(args[1:], prog='zvdrtools %s' % args[0])
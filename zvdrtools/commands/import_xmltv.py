@@ -0,0 +1,93 @@
+# -*- coding: utf8 -*-
+"""
+Import XMLTV schedule to VDR EPG
+"""
+import logging
+import sys
+from zvdrtools.epg.xmltvhelper import XMLTV, read_xmltv2vdr_mappings
+from zvdrtools.svdrpsend import SVDRP
+from zvdrtools.vdrtools import get_vdr_channels_custom_dict, get_channel_id, get_vdr_channels_conf_reader
+
+logger = logging.getLogger(__name__)
+
+
+def get_vdr_channels_map(channels_conf):
+    return get_vdr_channels_custom_dict(channels_conf, get_channel_id, lambda channel: channel.name)
+
+
+def main(args=None, prog=None):
+    from optparse import OptionParser
+    usage = "usage: %prog [options]..."
+    parser = OptionParser(usage, prog=prog)
+    parser.add_option("-d", "--host", action="store", type="string", dest="hostname", default='localhost',
+                      help="SVDRP destination hostname (default: localhost)")
+    parser.add_option("-p", "--port", action="store", type="int", dest="port", default=6419,
+                      help="SVDRP port number (default: 6419)")
+    parser.add_option("-f", "--file", action="store", type="string", dest="vdr_channels_file",
+                      help="Path to channels.conf file. Channels wil be read from given channels.conf file.")
+    parser.add_option("-v", "--verbose", action="store_true", dest="verbose",
+                      help="verbose output with debug info")
+    parser.add_option("-x", "--xmltv", action="append", type="string", dest="xmltv_filenames",
+                      help="Path to XMLTV file (default: ./tvprogram_ua_ru.gz). Can be used several times, "
+                           "files will be merged with feeds priority from [Priorities] section of "
+                           "channels-map.ini or in the given order")
+    parser.add_option("-o", "--out", action="store", type="string", dest="xmltv_channels_map_config",
+                      default='./channels-map.ini',
+                      help="Path to channels-map.ini file (default: ./channels-map.ini")
+    parser.add_option("-t", "--debug-dump", action="store", type="string", dest="debug_dump",
+                      help="Debug dry mode - dump all commands to file, no actual commands send to host")
+    parser.add_option("-D", "--daemon", action="store_true", dest="daemon",
+                      help="Daemon mode - keep running and upload changed EPG when XMLTV, channels.conf or "
+                           "channels-map.ini files are changed. Send SIGHUP to force full resync. "
+                           "Without --file VDR channels are received with SVDRP and reloaded on SIGHUP only")
+    parser.add_option("-i", "--poll-interval", action="store", type="int", dest="poll_interval", default=60,
+                      help="Daemon mode files check interval in seconds (default: 60)")
+    parser.add_option("-m", "--max-memory", action="store", type="int", dest="max_memory",
+                      help="Memory budget in MB. XMLTV files are streamed through bounded queues without building "
+                           "XMLTV tree, reading is throttled when the budget is approached, "
+                           "the import is aborted if the budget is exceeded")
+    (options, args) = parser.parse_args(args)
+    if options.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    if not options.xmltv_filenames:
+        options.xmltv_filenames = ['./tvprogram_ua_ru.gz']
+
+    memory_budget = None
+    if options.max_memory is not None:
+        from zvdrtools.pipeline import MemoryBudget
+        memory_budget = MemoryBudget(options.max_memory * 1024 * 1024)
+    svdrp = SVDRP(hostname=options.hostname, port=options.port, debug_dump=options.debug_dump,
+                  keep_response=memory_budget is None)
+    if options.daemon:
+        from zvdrtools.epg.xmltvdaemon import XMLTVImportDaemon
+        daemon = XMLTVImportDaemon(options.xmltv_filenames, options.xmltv_channels_map_config, svdrp,
+                                   vdr_channels_file=options.vdr_channels_file,
+                                   hostname=options.hostname, port=options.port,
+                                   poll_interval=options.poll_interval, memory_budget=memory_budget)
+        daemon.run()
+        return
+    channels_conf = get_vdr_channels_conf_reader(options.vdr_channels_file, options.hostname, options.port)
+    channels_dict = get_vdr_channels_custom_dict(channels_conf, get_channel_id, lambda channel: channel.name)
+    channels_map = read_xmltv2vdr_mappings(options.xmltv_channels_map_config, channels_dict)
+    if len(options.xmltv_filenames) > 1 or memory_budget is not None:
+        from zvdrtools.epg.xmltvmerge import read_xmltv_feeds_priorities, process_xmltv_feeds
+        from zvdrtools.pipeline import MemoryBudgetExceeded
+        get_priority = read_xmltv_feeds_priorities(options.xmltv_channels_map_config, options.xmltv_filenames)
+        try:
+            process_xmltv_feeds(options.xmltv_filenames, channels_map, svdrp, get_priority, memory_budget)
+        except MemoryBudgetExceeded as e:
+            logger.error('EPG import is aborted: %s', e)
+            sys.exit(1)
+    else:
+        xmltv_handler = XMLTV()
+        xmltv_handler.parse_xmltv_file(options.xmltv_filenames[0], channels_map)
+        xmltv_handler.process_tv_schedule(channels_map, svdrp)
+    if memory_budget is not None:
+        from zvdrtools.pipeline import get_peak_rss
+        logger.info('Peak memory usage: %.1f MB (budget %d MB)', get_peak_rss() / 1048576.0, options.max_memory)
+
+
+if __name__ == '__main__':
+    main()
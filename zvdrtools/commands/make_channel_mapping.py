@@ -0,0 +1,198 @@
+# -*- coding: utf8 -*-
+"""
+Generate XMLTV to VDR channels mapping
+"""
+import logging
+import os
+from zvdrtools.enigma2tools import get_e2vdr_channels_map
+from zvdrtools.epg.namematch import ChannelNameIndex
+from zvdrtools.epg.xmltvhelper import store_xmltv2vdr_mappings, load_xmltv2vdr_mappings, \
+    read_xmltv2vdr_fuzzy_candidates
+from zvdrtools.vdrtools import get_vdr_channels_conf_reader, get_vdr_channels_custom_dict, get_channel_id
+
+try:
+    from xml.etree.cElementTree import ElementTree, Element, iterparse
+except ImportError:
+    from xml.etree.ElementTree import ElementTree, Element, iterparse
+
+logger = logging.getLogger(__name__)
+
+
+def process_linuxsat_mappings(xmltv_channels_file, channels_dict):
+    if xmltv_channels_file.endswith('gz'):
+        import gzip
+
+        open_func = gzip.open
+    else:
+        open_func = open
+    xmltv_channels_map = {}
+    with open_func(xmltv_channels_file) as fp:
+        for event, elem in iterparse(fp):
+            if elem.tag == 'channel' and len(elem.attrib['id']) > 0:
+                elem_service_ref = elem.text.rstrip(':').lower()
+                xmltv_id = elem.attrib['id']
+                for channel in channels_dict.get(elem_service_ref, ()):
+                    map_item = xmltv_channels_map.setdefault(xmltv_id, [])
+                    if channel['channel_id'] not in [item['channel_id'] for item in map_item]:
+                        map_item.append(channel)
+                        logger.info('%s (%s) - %s', channel['name'], channel['channel_id'], xmltv_id)
+    return xmltv_channels_map
+
+
+def get_stored_mappings(xmltv_channels_map_config, channels_dict):
+    """
+    Read mappings already stored in channels-map.ini (including hand edited ones).
+    Stored VDR channels missed in channels_dict are dropped. Fuzzy matched mappings keep their scored candidates
+    unless the mapping was changed by hand.
+    :return: {<XMLTV_ID>: [{'channel_id': <VDR Channel ID>, 'name': <VDR Channel Name>}, ...]} dictionary
+    """
+    import ConfigParser
+    if not os.path.exists(xmltv_channels_map_config):
+        return {}
+    try:
+        stored_mappings = load_xmltv2vdr_mappings(xmltv_channels_map_config)
+    except ConfigParser.NoSectionError:
+        return {}
+    fuzzy_candidates = read_xmltv2vdr_fuzzy_candidates(xmltv_channels_map_config)
+    channels_names = dict((channel['channel_id'], channel['name'])
+                          for channels in channels_dict.values() for channel in channels)
+    xmltv_channels_map = {}
+    for xmltv_id, channels_id in stored_mappings.iteritems():
+        map_item = [{'channel_id': channel_id, 'name': channels_names[channel_id]}
+                    for channel_id in channels_id if channel_id in channels_names]
+        if len(map_item) < len(channels_id):
+            logger.info('Drop not available VDR channels %s from stored mapping %s',
+                        [channel_id for channel_id in channels_id if channel_id not in channels_names], xmltv_id)
+        if not map_item:
+            continue
+        candidates = [(score, dict(item, name=channels_names[item['channel_id']]))
+                      for score, item in fuzzy_candidates.get(xmltv_id, ()) if item['channel_id'] in channels_names]
+        if candidates and [item['channel_id'] for item in map_item] == [candidates[0][1]['channel_id']]:
+            map_item[0]['candidates'] = candidates
+        xmltv_channels_map[xmltv_id] = map_item
+    return xmltv_channels_map
+
+
+def get_xmltv_channels_names(xmltv_file):
+    """
+    Read XMLTV channels display names. Channel ID without country suffix is used for channels without display names
+    (like this: 1plus1.ua -> 1plus1)
+    :return: {<XMLTV_ID>: [<name>, ...]} dictionary
+    """
+    if xmltv_file.endswith('gz'):
+        import gzip
+
+        open_func = gzip.open
+    else:
+        open_func = open
+    xmltv_channels_names = {}
+    with open_func(xmltv_file) as fp:
+        for event, elem in iterparse(fp):
+            if elem.tag == 'channel' and len(elem.attrib['id']) > 0:
+                xmltv_id = elem.attrib['id']
+                names = [name_elem.text for name_elem in elem.findall('display-name') if name_elem.text]
+                if not names:
+                    id_parts = xmltv_id.rsplit('.', 1)
+                    names = [id_parts[0] if len(id_parts) == 2 and len(id_parts[1]) <= 3 else xmltv_id]
+                xmltv_channels_names.setdefault(xmltv_id, []).extend(names)
+                elem.clear()
+            elif elem.tag == 'programme':
+                #all channels are defined before programmes
+                break
+    return xmltv_channels_names
+
+
+def process_fuzzy_mappings(xmltv_channels_names, channels_dict, xmltv_channels_map, threshold, candidates_count=3):
+    """
+    Map XMLTV channels not mapped yet to not mapped VDR channels by names similarity.
+    Best scored pairs are mapped first, every VDR channel is mapped once.
+    :param xmltv_channels_map: already known mappings (service references matched and stored ones),
+                               their XMLTV and VDR channels are not matched again
+    """
+    mapped_channels_id = set(item['channel_id'] for map_item in xmltv_channels_map.values() for item in map_item)
+    name_index = ChannelNameIndex()
+    for channel in (channel for channels in channels_dict.values() for channel in channels):
+        if channel['channel_id'] not in mapped_channels_id:
+            name_index.add([channel['name'], '%s %s' % (channel['name'], channel['provider'])], channel)
+
+    matches = []
+    for xmltv_id, names in xmltv_channels_names.iteritems():
+        if xmltv_id not in xmltv_channels_map:
+            candidates = [(score, channel) for score, channel in name_index.search(names, candidates_count)
+                          if score >= threshold]
+            if candidates:
+                matches.append((candidates[0][0], xmltv_id, candidates))
+    for best_score, xmltv_id, candidates in sorted(matches, reverse=True):
+        free_candidates = [(score, channel) for score, channel in candidates
+                           if channel['channel_id'] not in mapped_channels_id]
+        if free_candidates:
+            score, channel = free_candidates[0]
+            mapped_channels_id.add(channel['channel_id'])
+            xmltv_channels_map[xmltv_id] = [dict(channel, candidates=free_candidates)]
+            logger.info('%s (%s) - %s, fuzzy score %.2f', channel['name'], channel['channel_id'], xmltv_id, score)
+    return xmltv_channels_map
+
+
+def main(args=None, prog=None):
+    from optparse import OptionParser
+    usage = "usage: %prog [options]..."
+    parser = OptionParser(usage, prog=prog)
+    parser.add_option("-d", "--host", action="store", type="string", dest="hostname", default='localhost',
+                      help="SVDRP destination hostname (default: localhost)")
+    parser.add_option("-p", "--port", action="store", type="int", dest="port", default=6419,
+                      help="SVDRP port number (default: 6419)")
+    parser.add_option("-f", "--file", action="store", type="string", dest="vdr_channels_file",
+                      help="Path to channels.conf file. SVDRP parameters will be ignored")
+    parser.add_option("-v", "--verbose", action="store_true", dest="verbose",
+                      help="verbose output with debug info")
+    parser.add_option("-x", "--lstv", action="store", type="string", dest="xmltv_channels_file",
+                      default='./ua.channels.xml.gz',
+                      help="Path to ??.channels.xml.gz file (default: ./ua.channels.xml.gz")
+    parser.add_option("-o", "--out", action="store", type="string", dest="xmltv_channels_map_config",
+                      default='./channels-map.ini',
+                      help="Path to channels-map.ini file (default: ./channels-map.ini")
+    parser.add_option("-i", "--id-list", action="store_true", dest="id_list_only",
+                      help="show VDR channels ID and exit")
+    parser.add_option("-n", "--names", action="append", type="string", dest="xmltv_names_files",
+                      help="Path to XMLTV file with channels display names for fuzzy matching of channels with "
+                           "not matched service references. Can be used several times "
+                           "(default: ??.channels.xml.gz file channels ID)")
+    parser.add_option("--fuzzy-threshold", action="store", type="float", dest="fuzzy_threshold", default=0.7,
+                      help="Minimal names similarity score (0..1) for fuzzy matching (default: 0.7)")
+    parser.add_option("--no-fuzzy", action="store_true", dest="no_fuzzy",
+                      help="disable fuzzy names matching")
+    (options, args) = parser.parse_args(args)
+    if options.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    channels_conf = get_vdr_channels_conf_reader(options.vdr_channels_file, options.hostname, options.port)
+    if options.id_list_only:
+        logger.debug("Show VDR Channels ID only")
+        channels_dict = get_vdr_channels_custom_dict(channels_conf,
+                                                     lambda channel: '%s-%s' % (get_channel_id(channel), channel.freq),
+                                                     lambda channel: {'name': channel.name,
+                                                                      'id': get_channel_id(channel)}
+        )
+        for channel in channels_dict.values():
+            print "%s=%s" % (channel['name'], channel['id'])
+    else:
+        channels_dict = get_e2vdr_channels_map(channels_conf)
+        xmltv_channels_map = process_linuxsat_mappings(options.xmltv_channels_file, channels_dict)
+        #keep stored (possibly hand edited) mappings of channels not matched by service reference
+        for xmltv_id, map_item in get_stored_mappings(options.xmltv_channels_map_config,
+                                                      channels_dict).iteritems():
+            if xmltv_id not in xmltv_channels_map:
+                logger.debug('Keep stored mapping %s', xmltv_id)
+                xmltv_channels_map[xmltv_id] = map_item
+        if not options.no_fuzzy:
+            xmltv_channels_names = {}
+            for xmltv_names_file in options.xmltv_names_files or [options.xmltv_channels_file]:
+                for xmltv_id, names in get_xmltv_channels_names(xmltv_names_file).iteritems():
+                    xmltv_channels_names.setdefault(xmltv_id, []).extend(names)
+            process_fuzzy_mappings(xmltv_channels_names, channels_dict, xmltv_channels_map, options.fuzzy_threshold)
+        store_xmltv2vdr_mappings(options.xmltv_channels_map_config, xmltv_channels_map)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+# -*- coding: utf8 -*-
+"""
+ocram picons.sh processing
+"""
+import logging
+import os
+from zvdrtools.enigma2tools import get_enigma2_channels_refs
+from zvdrtools.vdrtools import get_vdr_channels_conf_reader, get_vdr_channels_list, get_channel_id
+
+
+logger = logging.getLogger(__name__)
+OCRAM_CACHE_VERSION = 1
+
+
+def parse_ocram_sh(ocram_sh_data):
+    """
+    Extract picons links from ocram's picons.sh file content
+    (lines like this: ln -s 1plus1.png tv.5_14_1_DE82A36.uid)
+    :return: [(<ocram picon file name>, <ocram channel id>), ...] list
+    """
+    ocram_index = []
+    for sh_line in ocram_sh_data.splitlines():
+        sh_parts = sh_line.split()
+        if len(sh_parts) == 4 and sh_parts[0] == 'ln' and sh_parts[1] == '-s' \
+                and sh_parts[3].endswith('.uid') and len(sh_parts[3]) > 4:
+            ocram_index.append((sh_parts[2], sh_parts[3][:-4]))
+    return ocram_index
+
+
+def read_ocram_sh_index(ocram_sh_filename, cache_filename=None):
+    """
+    Read ocram's picons.sh file links index (see parse_ocram_sh).
+    If cache_filename is provided parsed index is cached there, the cache is keyed by picons.sh file digest.
+    """
+    import hashlib
+    import marshal
+    with open(ocram_sh_filename, 'rb') as ocram_sh_file:
+        ocram_sh_data = ocram_sh_file.read()
+    if cache_filename is None:
+        return parse_ocram_sh(ocram_sh_data)
+
+    ocram_sh_digest = hashlib.md5(ocram_sh_data).hexdigest()
+    try:
+        with open(cache_filename, 'rb') as cache_file:
+            cache_version, cache_digest, ocram_index = marshal.load(cache_file)
+        if cache_version == OCRAM_CACHE_VERSION and cache_digest == ocram_sh_digest:
+            logger.debug('Use cached <%s> index', ocram_sh_filename)
+            return ocram_index
+    except (IOError, EOFError, ValueError, TypeError):
+        logger.debug('Cache <%s> is not available', cache_filename)
+    ocram_index = parse_ocram_sh(ocram_sh_data)
+    try:
+        with open(cache_filename, 'wb') as cache_file:
+            marshal.dump((OCRAM_CACHE_VERSION, ocram_sh_digest, ocram_index), cache_file)
+    except IOError as e:
+        logger.warning('Unable to store cache <%s>: %s', cache_filename, e)
+    return ocram_index
+
+
+def get_link_target_dir(link_target_mask):
+    """
+    Return directory part of symlink target mask before the first named parameter
+    (like this: './ocram/%(ocram_name)s' -> './ocram/'), or empty string if it has no static directory
+    """
+    target_dir = os.path.dirname(link_target_mask.split('%(', 1)[0])
+    return os.path.join(target_dir, '') if target_dir else ''
+
+
+def apply_links(links, links_dir, prune_target_dir=None):
+    """
+    Create or update symlinks in links_dir. Existing symlinks are compared with required ones first,
+    so only changed symlinks are written, every symlink is replaced atomically.
+    :param links: {<link name>: <link target>} dictionary
+    :param prune_target_dir: remove other symlinks in links_dir whose target is in the given directory
+                             (symlinks managed by this tool)
+    :return: (<updated links count>, <removed links count>) tuple
+    """
+    existing_links = {}
+    existing_names = set(os.listdir(links_dir))
+    for name in existing_names:
+        try:
+            existing_links[name] = os.readlink(os.path.join(links_dir, name))
+        except OSError:
+            #not a symlink
+            pass
+
+    updated_count = removed_count = 0
+    for name, target in sorted(links.iteritems()):
+        if existing_links.get(name) == target:
+            continue
+        if name in existing_names and name not in existing_links:
+            logger.warning('<%s> exists and is not a symlink, skip it', name)
+            continue
+        link_path = os.path.join(links_dir, name)
+        tmp_link_path = os.path.join(links_dir, '.%s.tmp' % name)
+        try:
+            if os.path.lexists(tmp_link_path):
+                os.remove(tmp_link_path)
+            os.symlink(target, tmp_link_path)
+            os.rename(tmp_link_path, link_path)
+        except OSError as e:
+            logger.error('Unable to link <%s> to <%s>: %s', name, target, e)
+            continue
+        logger.debug('Link <%s> to <%s>', name, target)
+        updated_count += 1
+    if prune_target_dir:
+        for name in sorted(set(existing_links) - set(links)):
+            if not existing_links[name].startswith(prune_target_dir):
+                continue
+            try:
+                os.remove(os.path.join(links_dir, name))
+            except OSError as e:
+                logger.error('Unable to remove link <%s>: %s', name, e)
+                continue
+            logger.debug('Remove link <%s>', name)
+            removed_count += 1
+    return updated_count, removed_count
+
+
+def main(args=None, prog=None):
+    from optparse import OptionParser
+    parser = OptionParser(prog=prog)
+    parser.add_option("-d", "--host", action="store", type="string", dest="hostname", default='localhost',
+                      help="SVDRP destination hostname (default: localhost)")
+    parser.add_option("-p", "--port", action="store", type="int", dest="port", default=6419,
+                      help="SVDRP port number (default: 6419)")
+    parser.add_option("-f", "--file", action="store", type="string", dest="vdr_channels_file",
+                      help="Path to channels.conf file. SVDRP parameters will be ignored")
+    parser.add_option("-v", "--verbose", action="store_true", dest="verbose",
+                      help="verbose output with debug info")
+    parser.add_option("-i", "--ocram_file", action="store", type="string", dest="ocram_sh_file", default='./picons.sh',
+                      help="Path to ocram's picons.sh file (default: ./picons.sh)")
+    parser.add_option("--out_mask", action="store", type="string", dest="out_mask", default='%(ocram_name)s - %(vdr_name)s',
+                      help="Output print mask. You may use the following named parameters: 'ocram_name', 'vdr_name'"
+                           ", 'vdr_id'. Default value: '%(ocram_name)s - %(vdr_name)s')")
+    parser.add_option("-l", "--link_dir", action="store", type="string", dest="link_dir",
+                      help="Create or update picons symlinks in the given directory instead of printing")
+    parser.add_option("--link_mask", action="store", type="string", dest="link_mask",
+                      default='%(vdr_name)s%(ocram_file_ext)s',
+                      help="Symlink name mask, named parameters are the same as for --out_mask. "
+                           "Default value: '%(vdr_name)s%(ocram_file_ext)s'")
+    parser.add_option("--link_target_mask", action="store", type="string", dest="link_target_mask",
+                      default='./ocram/%(ocram_name)s',
+                      help="Symlink target mask, named parameters are the same as for --out_mask. "
+                           "Default value: './ocram/%(ocram_name)s'")
+    parser.add_option("--link_prune", action="store_true", dest="link_prune",
+                      help="Remove symlinks which are not required anymore from --link_dir directory. "
+                           "Only symlinks to the --link_target_mask directory are removed")
+    parser.add_option("--cache_file", action="store", type="string", dest="cache_file",
+                      help="Path to picons.sh parsing cache file")
+    (options, args) = parser.parse_args(args)
+    if options.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+    #read our VDR channels
+    channels_conf = get_vdr_channels_conf_reader(options.vdr_channels_file, options.hostname, options.port)
+    channels_by_ocram_id = get_enigma2_channels_refs(get_vdr_channels_list(channels_conf)).by_ocram_id
+
+    #process ocram picons.sh file
+    ocram_map = dict()
+    for ocram_name, ocram_channel_id in read_ocram_sh_index(options.ocram_sh_file, options.cache_file):
+        for channel in channels_by_ocram_id.get(ocram_channel_id, ()):
+            ocram_file_name, ocram_file_ext = os.path.splitext(ocram_name)
+            channel_id = get_channel_id(channel)
+            ocram_map[(ocram_name, channel_id)] = {'ocram_name' : ocram_name,
+                                                   'ocram_file_name': ocram_file_name,
+                                                   'ocram_file_ext': ocram_file_ext,
+                                                   'vdr_name' : channel.name,
+                                                   'vdr_id' : channel_id
+            }
+
+    #dump results
+    links = {}
+    for ocram_key in sorted(ocram_map):
+        mask_params = ocram_map[ocram_key]
+        if options.link_dir is not None:
+            links[options.link_mask % mask_params] = options.link_target_mask % mask_params
+        else:
+            print options.out_mask % mask_params
+    if options.link_dir is not None:
+        prune_target_dir = None
+        if options.link_prune:
+            prune_target_dir = get_link_target_dir(options.link_target_mask)
+            if not prune_target_dir:
+                logger.warning('--link_target_mask has no directory part, managed symlinks are unknown, skip pruning')
+        updated_count, removed_count = apply_links(links, options.link_dir, prune_target_dir)
+        logger.info('%d links: %d updated, %d removed', len(links), updated_count, removed_count)
+
+
+if __name__ == '__main__':
+    main()
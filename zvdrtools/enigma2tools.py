@@ -8,9 +8,9 @@ Info used:
 -- https://github.com/tkurbad/piconscripts
 -- https://github.com/k2s/enigma2-php
 """
-from decimal import Decimal
+from collections import namedtuple
 import logging
-from zvdrtools.vdrtools import ChannelSource, get_polarisation, get_channel_id, get_vdr_channels_custom_dict
+from zvdrtools.vdrtools import get_polarisation, get_channel_id, get_vdr_channels_list
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +19,22 @@ DVB_POLARISATION_FLAG_MAP = {'H': 0,
                              'L': 2,
                              'R': 3}
 
+Enigma2ChannelsRefs = namedtuple('Enigma2ChannelsRefs', 'channels service_refs namespaces ocram_ids'
+                                                        ' by_service_ref by_ocram_id')
+
 
 def enigma2_is_valid_ONID_TSID(onid, tsid, degree):
     """
     Define if ONID/TSID data is valid or not
     Ported from OpenPLi
     """
-    orbital_position = int(degree*10)
+    return enigma2_is_valid_onid_tsid_position(onid, tsid, int(degree*10))
+
+
+def enigma2_is_valid_onid_tsid_position(onid, tsid, orbital_position):
+    """
+    Same as enigma2_is_valid_ONID_TSID with orbital position in tenths of degree
+    """
     if onid == 0 or onid == 0x1111:
         return False
     elif onid == 1:
@@ -43,47 +52,81 @@ def get_enigma2_service_reference(channel_data):
     Calculate Enigma2 DVB service reference string from channel data
     (like this: 1:0:1:5:14:1:de82a36:0:0:0)
     """
-    logger.debug('Getting Enigma 2 ServiceRef for %s', channel_data)
-    sat_hash = freq_hash = 0
-    stream_type = 1
-    if channel_data.vpid in ('0', '1'):
-        stream_type = 2
-    elif '=' in channel_data.vpid:
-        (pid, video_mode) = [x.strip() for x in channel_data.vpid.split('=')]
+    service_ref = get_enigma2_channels_refs([channel_data]).service_refs[0]
+    logger.debug('Enigma 2 ServiceRef for %s is: %s', channel_data, service_ref)
+    return service_ref
 
-        if video_mode == '2':
-            stream_type = 1
-        #TODO try to understand what is that?
-        # Doesn't work good for me
-        #if video_mode == '27':
-        #    stream_type = 0x19
 
-    if channel_data.source.startswith('S'):
-        sat_source = ChannelSource(channel_data.source[0], Decimal(channel_data.source[1:-1]), channel_data.source[-1])
-        if sat_source .origin == 'W':
-            #enigma2 uses a 3600 east/west origin for the namespace
-            sat_hash = int(3600 - sat_source.degree*10)
-        else:
-            sat_hash = int(sat_source.degree*10)
-        # on invalid ONIDs, build hash from frequency and polarisation
-        if not enigma2_is_valid_ONID_TSID(channel_data.nid, channel_data.tid, sat_source.degree):
-            pol = DVB_POLARISATION_FLAG_MAP[get_polarisation(channel_data.parameters)]
-            freq_hash = (channel_data.freq & 0xFFFF) | ((pol & 1) << 15)
-    elif channel_data.source.startswith('C'):
-        sat_hash = 0xFFFF
-    elif channel_data.source.startswith('T'):
-        sat_hash = 0xEEEE
-    elif channel_data.source.startswith('A'):
-        sat_hash = 0xDDDD
-    namespace = (sat_hash << 16) | freq_hash
-    #TODO explore 1:0 prefix and 0:0:0 suffix
-    service_ref = '1:0:%x:%x:%x:%x:%x:0:0:0' % (stream_type, channel_data.sid, channel_data.tid, channel_data.nid, namespace)
-    logger.debug('Enigma 2 ServiceRef is: %s', service_ref)
-    return service_ref
+def get_source_orbital_position(source):
+    """
+    Return satellite orbital position in tenths of degree for VDR source string (S19.2E -> 192)
+    """
+    degree = source[1:-1]
+    if '.' in degree:
+        (degree, degree_fraction) = degree.split('.', 1)
+        return int(degree) * 10 + int(degree_fraction[:1] or 0)
+    return int(degree) * 10
+
+
+def get_enigma2_channels_refs(channels):
+    """
+    Calculate Enigma2 service references, namespaces and ocram channel IDs for the whole channels list at once.
+    Unlike get_enigma2_service_reference it uses integer math only and doesn't parse formatted references back.
+    :param channels: list of Channel namedtuples
+    :return: Enigma2ChannelsRefs namedtuple with lists in channels order and reverse indexes:
+             by_service_ref ({<service reference>: [<Channel>, ...]}) and by_ocram_id ({<ocram ID>: [<Channel>, ...]})
+    """
+    service_refs = []
+    namespaces = []
+    ocram_ids = []
+    by_service_ref = {}
+    by_ocram_id = {}
+    for channel_data in channels:
+        stream_type = 1
+        if channel_data.vpid in ('0', '1'):
+            stream_type = 2
+        sat_hash = freq_hash = 0
+        if channel_data.source.startswith('S'):
+            orbital_position = get_source_orbital_position(channel_data.source)
+            if channel_data.source[-1] == 'W':
+                #enigma2 uses a 3600 east/west origin for the namespace
+                sat_hash = 3600 - orbital_position
+            else:
+                sat_hash = orbital_position
+            # on invalid ONIDs, build hash from frequency and polarisation
+            if not enigma2_is_valid_onid_tsid_position(channel_data.nid, channel_data.tid, orbital_position):
+                pol = DVB_POLARISATION_FLAG_MAP[get_polarisation(channel_data.parameters)]
+                freq_hash = (channel_data.freq & 0xFFFF) | ((pol & 1) << 15)
+        elif channel_data.source.startswith('C'):
+            sat_hash = 0xFFFF
+        elif channel_data.source.startswith('T'):
+            sat_hash = 0xEEEE
+        elif channel_data.source.startswith('A'):
+            sat_hash = 0xDDDD
+        namespace = (sat_hash << 16) | freq_hash
+        service_ref = '1:0:%x:%x:%x:%x:%x:0:0:0' % (stream_type, channel_data.sid, channel_data.tid,
+                                                    channel_data.nid, namespace)
+        ocram_id = '%s.%X_%X_%X_%X' % ('radio' if stream_type == 2 else 'tv', channel_data.sid, channel_data.tid,
+                                       channel_data.nid, namespace)
+        service_refs.append(service_ref)
+        namespaces.append(namespace)
+        ocram_ids.append(ocram_id)
+        by_service_ref.setdefault(service_ref, []).append(channel_data)
+        by_ocram_id.setdefault(ocram_id, []).append(channel_data)
+    return Enigma2ChannelsRefs(channels, service_refs, namespaces, ocram_ids, by_service_ref, by_ocram_id)
 
 
 def get_e2vdr_channels_map(channels_conf):
-    def get_dict_value(channel):
-        channel_id = get_channel_id(channel)
-        return {'name': channel.name, 'channel_id': channel_id}
-    return get_vdr_channels_custom_dict(channels_conf, get_enigma2_service_reference, get_dict_value)
\ No newline at end of file
+    """
+    Map Enigma2 service references to VDR channels. Several channels may share the same reference
+    (like DVB-C channels with the same SID/TID/NID), all of them are kept.
+    :return: {<service reference>: [{'name': <name>, 'provider': <provider>, 'channel_id': <VDR Channel ID>}, ...]}
+             dictionary
+    """
+    channels_refs = get_enigma2_channels_refs(get_vdr_channels_list(channels_conf))
+    channels_map = {}
+    for service_ref, channels in channels_refs.by_service_ref.iteritems():
+        channels_map[service_ref] = [{'name': channel.name, 'provider': channel.provider,
+                                      'channel_id': get_channel_id(channel)} for channel in channels]
+        logger.debug('%s => %s', service_ref, channels_map[service_ref])
+    return channels_map
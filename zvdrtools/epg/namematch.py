@@ -0,0 +1,108 @@
+# -*- coding: utf8 -*-
+"""
+Fuzzy channel names matching with n-gram inverted index
+"""
+from collections import defaultdict
+import heapq
+import logging
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+NAME_GRAM_SIZE = 3
+#max index postings visited per searched name, rarest grams are visited first
+MAX_POSTINGS_VISITED = 500
+#number of best candidates rescored with exact similarity
+RESCORE_CANDIDATES_COUNT = 20
+#score multiplier for names with different numbers (like 'Eurosport 1' and 'Eurosport 2')
+NUMBERS_MISMATCH_PENALTY = 0.5
+
+name_token_re = re.compile(r'\w+', re.UNICODE)
+name_number_re = re.compile(r'\d+')
+
+
+def normalize_channel_name(name):
+    """
+    Normalize channel name for comparison: lower case, no accents, no punctuation
+    (like this: 'Ciné+ HD' -> 'cine plus hd')
+    """
+    if isinstance(name, str):
+        name = name.decode('utf-8', 'replace')
+    name = unicodedata.normalize('NFKD', name.replace(u'+', u' plus '))
+    name = u''.join(c for c in name if not unicodedata.combining(c))
+    return u' '.join(name_token_re.findall(name.lower()))
+
+
+def get_name_grams(name):
+    """
+    Return n-grams set of given normalized channel name (spaces are ignored)
+    """
+    compact_name = u'#%s#' % name.replace(u' ', u'')
+    return frozenset(compact_name[i:i + NAME_GRAM_SIZE]
+                     for i in range(max(1, len(compact_name) - NAME_GRAM_SIZE + 1)))
+
+
+def get_name_numbers(name):
+    """
+    Return numbers set of given normalized channel name
+    """
+    return frozenset(int(number) for number in name_number_re.findall(name))
+
+
+def get_grams_similarity(grams, other_grams):
+    """
+    Dice coefficient of two n-grams sets
+    """
+    return 2.0 * len(grams & other_grams) / (len(grams) + len(other_grams))
+
+
+class ChannelNameIndex(object):
+    """
+    Inverted n-gram index of channel names. Candidates are selected through the index postings of the rarest
+    searched name n-grams within MAX_POSTINGS_VISITED budget, so a search costs the same for any index size.
+    """
+    def __init__(self):
+        self._entries = []
+        self._postings = defaultdict(list)
+
+    def add(self, names, value):
+        """
+        Add value to the index under given names (like channel name and 'channel name provider')
+        """
+        for name in names:
+            name = normalize_channel_name(name)
+            grams = get_name_grams(name)
+            entry_index = len(self._entries)
+            self._entries.append((grams, get_name_numbers(name), value))
+            for gram in grams:
+                self._postings[gram].append(entry_index)
+
+    def search(self, names, limit=3):
+        """
+        Search index values for any of given names
+        :return: list of (<score>, <value>) tuples sorted by score, best first. Score is in 0..1 range,
+                 names with different numbers are penalized.
+        """
+        scores = {}
+        for name in names:
+            name = normalize_channel_name(name)
+            grams = get_name_grams(name)
+            numbers = get_name_numbers(name)
+            postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+            hits = defaultdict(int)
+            postings_budget = MAX_POSTINGS_VISITED
+            for posting in postings:
+                postings_budget -= len(posting)
+                if postings_budget < 0:
+                    break
+                for entry_index in posting:
+                    hits[entry_index] += 1
+            for entry_index in heapq.nlargest(RESCORE_CANDIDATES_COUNT, hits, key=hits.get):
+                entry_grams, entry_numbers, value = self._entries[entry_index]
+                score = get_grams_similarity(grams, entry_grams)
+                if numbers != entry_numbers:
+                    score *= NUMBERS_MISMATCH_PENALTY
+                if score > scores.get(id(value), (0, None))[0]:
+                    scores[id(value)] = (score, value)
+        return heapq.nlargest(limit, scores.values(), key=lambda item: item[0])
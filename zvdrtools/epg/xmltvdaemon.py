@@ -0,0 +1,158 @@
+# -*- coding: utf8 -*-
+"""
+Long-running XMLTV to VDR EPG import.
+Keeps VDR channels, XMLTV mappings and uploaded EPG fingerprints in memory
+and re-runs only the import stages affected by changed input files.
+"""
+import hashlib
+import logging
+import signal
+import time
+from zvdrtools.epg.xmltvhelper import XMLTV, read_xmltv2vdr_mappings, get_file_stamp
+from zvdrtools.epg.xmltvmerge import read_xmltv_feeds_priorities, process_xmltv_feeds
+from zvdrtools.pipeline import get_peak_rss
+from zvdrtools.vdrtools import get_vdr_channels_custom_dict, get_channel_id, get_vdr_channels_conf_reader
+
+logger = logging.getLogger(__name__)
+
+
+class XMLTVImportDaemon(object):
+    """
+    Poll XMLTV files, channels.conf and channels-map.ini for changes and upload changed EPG to VDR.
+    With a single XMLTV file only channels with changed EPG are uploaded, several XMLTV files
+    (or any files with memory_budget) are merged and uploaded completely.
+    SIGHUP forces full resync, SIGTERM stops the daemon.
+    VDR channels received with SVDRP (vdr_channels_file is None) are reloaded on SIGHUP only.
+    """
+    def __init__(self, xmltv_filenames, xmltv_channels_map_config, svdrp, vdr_channels_file=None,
+                 hostname='localhost', port=6419, poll_interval=60, memory_budget=None):
+        self.logger = logging.getLogger(__name__)
+        self.xmltv_filenames = xmltv_filenames
+        self.xmltv_channels_map_config = xmltv_channels_map_config
+        self.svdrp = svdrp
+        self.vdr_channels_file = vdr_channels_file
+        self.hostname = hostname
+        self.port = port
+        self.poll_interval = poll_interval
+        self.memory_budget = memory_budget
+        self._channels_dict = None
+        self._channels_map = None
+        self._fingerprints = {}
+        self._stamps = {}
+        self._resync = True
+        self._running = False
+
+    def get_watched_files(self):
+        watched_files = self.xmltv_filenames + [self.xmltv_channels_map_config]
+        if self.vdr_channels_file is not None:
+            watched_files.append(self.vdr_channels_file)
+        return watched_files
+
+    def request_resync(self, signum=None, frame=None):
+        self.logger.info('Full resync requested')
+        self._resync = True
+
+    def stop(self, signum=None, frame=None):
+        self.logger.info('Stop requested')
+        self._running = False
+
+    def load_channels(self):
+        channels_conf = get_vdr_channels_conf_reader(self.vdr_channels_file, self.hostname, self.port)
+        return get_vdr_channels_custom_dict(channels_conf, get_channel_id, lambda channel: channel.name)
+
+    def get_changed_channels(self, xmltv_handler, channels_map):
+        """
+        Compare loaded EPG with the last uploaded one
+        :return: (<list of XMLTV channels ID whose EPG or mapping was changed>,
+                  <{<XMLTV_ID>: <fingerprint>} dictionary of all loaded channels>) tuple
+        """
+        fingerprints = {}
+        for channel_name, digest in xmltv_handler.get_channels_fingerprints().iteritems():
+            channel_digest = hashlib.md5(digest)
+            channel_digest.update(repr(channels_map[channel_name]))
+            fingerprints[channel_name] = channel_digest.hexdigest()
+        changed_channels = [channel_name for channel_name in xmltv_handler.get_loaded_channels()
+                            if self._fingerprints.get(channel_name) != fingerprints[channel_name]]
+        return changed_channels, fingerprints
+
+    def poll(self):
+        """
+        Check watched files and run affected import stages
+        """
+        stamps = dict((filename, get_file_stamp(filename)) for filename in self.get_watched_files())
+        missing_files = [filename for filename, stamp in stamps.iteritems() if stamp is None]
+        if missing_files:
+            self.logger.warning('Files %s are not available, wait for them', missing_files)
+            return
+        #SIGHUP received during the sync requests the next resync
+        resync, self._resync = self._resync, False
+        try:
+            self.sync(stamps, resync)
+        except Exception:
+            #retry requested resync on the next poll
+            self._resync = self._resync or resync
+            raise
+
+    def sync(self, stamps, resync):
+        """
+        Run import stages affected by changed files
+        :param stamps: {<file name>: <file stamp>} dictionary of watched files
+        :param resync: run all stages
+        """
+        if resync:
+            self._channels_dict = self._channels_map = None
+            self._fingerprints = {}
+            changed_files = set(stamps)
+        else:
+            changed_files = set(filename for filename in stamps if stamps[filename] != self._stamps.get(filename))
+        if not changed_files:
+            return
+        self.logger.info('Changed files: %s', sorted(changed_files))
+
+        channels_dict, channels_map = self._channels_dict, self._channels_map
+        channels_changed = channels_dict is None or self.vdr_channels_file in changed_files
+        if channels_changed:
+            self.logger.info('Load VDR channels')
+            channels_dict = self.load_channels()
+        if channels_changed or self.xmltv_channels_map_config in changed_files:
+            self.logger.info('Load XMLTV mappings')
+            channels_map = read_xmltv2vdr_mappings(self.xmltv_channels_map_config, channels_dict)
+        fingerprints = self._fingerprints
+        xmltv_changed = changed_files.intersection(self.xmltv_filenames)
+        if len(self.xmltv_filenames) > 1 or self.memory_budget is not None:
+            if xmltv_changed or self.xmltv_channels_map_config in changed_files or channels_map != self._channels_map:
+                self.logger.info('Upload merged EPG')
+                get_priority = read_xmltv_feeds_priorities(self.xmltv_channels_map_config, self.xmltv_filenames)
+                process_xmltv_feeds(self.xmltv_filenames, channels_map, self.svdrp, get_priority,
+                                    self.memory_budget)
+                if self.memory_budget is not None:
+                    self.logger.info('Peak memory usage: %.1f MB', get_peak_rss() / 1048576.0)
+        elif xmltv_changed or channels_map != self._channels_map:
+            xmltv_handler = XMLTV()
+            xmltv_handler.parse_xmltv_file(self.xmltv_filenames[0], channels_map)
+            changed_channels, fingerprints = self.get_changed_channels(xmltv_handler, channels_map)
+            if changed_channels:
+                self.logger.info('Upload EPG for %d changed channels', len(changed_channels))
+                xmltv_handler.process_tv_schedule(channels_map, self.svdrp, changed_channels)
+            else:
+                self.logger.info('EPG is up to date')
+        # all stages are done, remember the new state
+        self._channels_dict, self._channels_map = channels_dict, channels_map
+        self._fingerprints = fingerprints
+        self._stamps = stamps
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self.request_resync)
+        signal.signal(signal.SIGTERM, self.stop)
+        self.logger.info('Start daemon, poll interval %d sec', self.poll_interval)
+        self._running = True
+        while self._running:
+            try:
+                self.poll()
+            except Exception:
+                # keep previous state, all stages will be retried on the next poll
+                self.logger.exception('Import failed')
+            if self._running:
+                # caught signal interrupts the sleep
+                time.sleep(self.poll_interval)
+        self.logger.info('Daemon stopped')
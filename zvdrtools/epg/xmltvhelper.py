@@ -5,15 +5,20 @@ XMLTV <-> VDR EPG conversion routines
 """
 from datetime import timedelta, datetime
 import calendar
+import hashlib
 import logging
+import os
 import xmltv
 
 try:
-    from xml.etree.cElementTree import ElementTree, Element, iterparse
+    from xml.etree.cElementTree import ElementTree, Element, iterparse, tostring
 except ImportError:
-    from xml.etree.ElementTree import ElementTree, Element, iterparse
+    from xml.etree.ElementTree import ElementTree, Element, iterparse, tostring
 
 MAP_SECTION = 'Mappings'
+MAP_INDEX_EXT = '.idx'
+MAP_INDEX_VERSION = 1
+FUZZY_COMMENT_PREFIX = ';fuzzy:'
 logger = logging.getLogger(__name__)
 
 
@@ -25,13 +30,30 @@ def get_timestamp_utc_now():
     return calendar.timegm(datetime.utcnow().utctimetuple())
 
 
+def get_file_stamp(filename):
+    """
+    Return (mtime, size) tuple for given file or None if file is not available
+    """
+    try:
+        file_stat = os.stat(filename)
+    except OSError:
+        return None
+    return file_stat.st_mtime, file_stat.st_size
+
+
+def get_xmltv2vdr_mappings_index_filename(xmltv_channels_map_config):
+    return xmltv_channels_map_config + MAP_INDEX_EXT
+
+
 def store_xmltv2vdr_mappings(xmltv_channels_map_config, xmltv_channels_map):
     """
-    Store XMLTV to VDR channels mapping to config file
+    Store XMLTV to VDR channels mapping to config file and compile it
     """
     import ConfigParser
     if len(xmltv_channels_map) > 0:
         config = ConfigParser.ConfigParser()
+        #XMLTV IDs are case sensitive
+        config.optionxform = str
         config.read(xmltv_channels_map_config)
 
         try:
@@ -42,31 +64,113 @@ def store_xmltv2vdr_mappings(xmltv_channels_map_config, xmltv_channels_map):
         for map_id, map_item in sorted(xmltv_channels_map.iteritems()):
             #store additional information as a comment
             item_comment = '; '.join(['%s=%s' % (item['channel_id'], item['name']) for item in map_item])
+            if 'candidates' in map_item[0]:
+                #fuzzy matched item, store all scored candidates
+                item_comment = FUZZY_COMMENT_PREFIX[1:] + ' ' + '; '.join(['%s=%s (%.2f)' % (item['channel_id'], item['name'], score)
+                                                      for score, item in map_item[0]['candidates']])
             config.set(MAP_SECTION, ';' + item_comment, '')
             #store the item itself
             item_value = ','.join([item['channel_id'] for item in map_item])
             config.set(MAP_SECTION, map_id, item_value)
         with open(xmltv_channels_map_config, 'wb') as configfile:
             config.write(configfile)
+        compile_xmltv2vdr_mappings(xmltv_channels_map_config)
 
 
-def read_xmltv2vdr_mappings(xmltv_channels_map_config, channels_dict):
+def read_xmltv2vdr_fuzzy_candidates(xmltv_channels_map_config):
     """
-    Read XMLTV to VDR channels mapping and check VDR Channels IDs existence in provided channels_dict
-    Return map dictionary in {<XMLTV_ID>: {'id': <VDR Channel ID>, 'name': <VDR Channel Name>}} format
+    Read scored candidates of fuzzy matched mappings from ';fuzzy:' comments of config file
+    (ConfigParser skips comments, so the file is parsed line by line)
+    :return: {<XMLTV_ID>: [(<score>, {'channel_id': <VDR Channel ID>, 'name': <VDR Channel Name>}), ...]} dictionary
+    """
+    import re
+    candidate_re = re.compile(r'^([^=]+)=(.*) \((\d+\.\d+)\)$')
+    fuzzy_candidates = {}
+    candidates = None
+    in_map_section = False
+    with open(xmltv_channels_map_config) as fp:
+        for line in fp:
+            line = line.strip()
+            if line.startswith('['):
+                in_map_section = line == '[%s]' % MAP_SECTION
+                candidates = None
+            elif not in_map_section or not line:
+                continue
+            elif line.startswith(FUZZY_COMMENT_PREFIX):
+                candidates = []
+                for candidate in line[len(FUZZY_COMMENT_PREFIX):].rstrip('= ').split('; '):
+                    candidate_match = candidate_re.match(candidate.strip())
+                    if candidate_match:
+                        channel_id, name, score = candidate_match.groups()
+                        candidates.append((float(score), {'channel_id': channel_id, 'name': name}))
+            elif line[0] in ';#':
+                continue
+            else:
+                if candidates:
+                    fuzzy_candidates[line.split('=', 1)[0].strip()] = candidates
+                candidates = None
+    return fuzzy_candidates
+
+
+def compile_xmltv2vdr_mappings(xmltv_channels_map_config):
+    """
+    Compile XMLTV to VDR channels mapping config file to marshal index file (<config file>.idx).
+    Index file is stamped with config file mtime and size.
+    Return mappings dictionary in {<XMLTV_ID>: [<VDR Channel ID>, ...]} format
     """
     import ConfigParser
+    import marshal
+    config_stamp = get_file_stamp(xmltv_channels_map_config)
     config = ConfigParser.ConfigParser()
+    #XMLTV IDs are case sensitive
+    config.optionxform = str
     config.read(xmltv_channels_map_config)
+    mappings = dict((opt, config.get(MAP_SECTION, opt).split(',')) for opt in config.options(MAP_SECTION))
+
+    index_filename = get_xmltv2vdr_mappings_index_filename(xmltv_channels_map_config)
+    logger.info('Compile <%s> mappings to <%s>', xmltv_channels_map_config, index_filename)
+    tmp_index_filename = '%s.%d.tmp' % (index_filename, os.getpid())
+    try:
+        with open(tmp_index_filename, 'wb') as fp:
+            marshal.dump((MAP_INDEX_VERSION, config_stamp, mappings), fp)
+        os.rename(tmp_index_filename, index_filename)
+    except (IOError, OSError) as e:
+        logger.warning('Unable to store mappings index <%s>: %s', index_filename, e)
+    return mappings
+
 
+def load_xmltv2vdr_mappings(xmltv_channels_map_config):
+    """
+    Load XMLTV to VDR channels mapping from compiled index file.
+    Index is recompiled if config file was changed since index compilation.
+    Return mappings dictionary in {<XMLTV_ID>: [<VDR Channel ID>, ...]} format
+    """
+    import marshal
+    index_filename = get_xmltv2vdr_mappings_index_filename(xmltv_channels_map_config)
+    try:
+        with open(index_filename, 'rb') as fp:
+            index_version, index_stamp, mappings = marshal.load(fp)
+    except (IOError, EOFError, ValueError, TypeError):
+        logger.debug('Mappings index <%s> is not available', index_filename)
+    else:
+        if index_version == MAP_INDEX_VERSION and index_stamp == get_file_stamp(xmltv_channels_map_config):
+            return mappings
+        logger.debug('Mappings index <%s> is outdated', index_filename)
+    return compile_xmltv2vdr_mappings(xmltv_channels_map_config)
+
+
+def read_xmltv2vdr_mappings(xmltv_channels_map_config, channels_dict):
+    """
+    Read XMLTV to VDR channels mapping and check VDR Channels IDs existence in provided channels_dict
+    Return map dictionary in {<XMLTV_ID>: {'id': <VDR Channel ID>, 'name': <VDR Channel Name>}} format
+    """
     channels_map = {}
-    for opt in config.options(MAP_SECTION):
-        map_channels_id = [{'id': c, 'name': channels_dict[c]}
-                           for c in config.get(MAP_SECTION, opt).split(',') if c in channels_dict]
+    for map_id, map_channels in load_xmltv2vdr_mappings(xmltv_channels_map_config).iteritems():
+        map_channels_id = [{'id': c, 'name': channels_dict[c]} for c in map_channels if c in channels_dict]
         if map_channels_id:
-            channels_map[opt] = map_channels_id
+            channels_map[map_id] = map_channels_id
         else:
-            logger.warning('For mapping rule <%s> there are no available any VDR channels. Refresh your mapping file.', opt)
+            logger.warning('For mapping rule <%s> there are no available any VDR channels. Refresh your mapping file.', map_id)
     return channels_map
 
 
@@ -107,6 +211,29 @@ class XMLTV:
                         elem.clear()
         self.logger.debug('File parsing complete!')
 
+    def iter_tv_schedule_file(self, filename, channel_list):
+        """
+        Stream programmes of channel_list from given xmltv file without building xml tree
+        :return: generator of programme dictionaries in file order
+        """
+        self.logger.debug("Start <%s> streaming>", filename)
+        if filename.endswith('gz'):
+            import gzip
+            open_func = gzip.open
+        else:
+            open_func = open
+        with open_func(filename) as fp:
+            root = None
+            for event, elem in iterparse(fp, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                elif event == 'end' and elem.tag in ('channel', 'programme'):
+                    if elem.tag == 'programme' and elem.attrib['channel'] in channel_list:
+                        yield self.parse_programme(elem)
+                    #processed elements are not needed anymore, release them
+                    root.clear()
+        self.logger.debug('File streaming complete!')
+
     @classmethod
     def parse_date_tz(cls, date_str):
         """
@@ -152,6 +279,18 @@ class XMLTV:
         for elem in self._tree.findall(filter_str):
             yield self.parse_programme(elem)
 
+    def get_channels_fingerprints(self):
+        """
+        Calculate digest of loaded programmes for every loaded channel
+        :return: {<XMLTV_ID>: <hex digest>} dictionary
+        """
+        digests = dict((channel_name, hashlib.md5()) for channel_name in self.get_loaded_channels())
+        for elem in self._tree.getroot().iter('programme'):
+            channel_name = elem.attrib['channel']
+            if channel_name in digests:
+                digests[channel_name].update(tostring(elem))
+        return dict((channel_name, digest.hexdigest()) for channel_name, digest in digests.iteritems())
+
     def send_clear_channel_epg(self, channels_id, svdrp):
         """
         Send to VDR clear channel EPG command for provided channels entries
@@ -174,54 +313,112 @@ class XMLTV:
         else:
             self.logger.error('EPG uploaded unsuccessfully, response: %s', upload_response)
 
-    def process_tv_schedule(self, channels_map, svdrp):
+    def start_epg_upload(self, svdrp):
+        """
+        Send to VDR start EPG upload command
+        """
+        self.logger.info('Start EPG upload')
+        svdrp_response = svdrp.send_command('PUTE')
+        self.logger.debug('SVDRP Response: %s', svdrp_response)
+
+    def finish_epg_upload(self, current_channel_id, svdrp):
+        """
+        Finish started EPG upload and check VDR response
+        """
+        if current_channel_id is not None:
+            svdrp.send('c')
+        svdrp_response = svdrp.send_command('.')
+        self.check_upload_result(svdrp_response)
+        self.logger.debug('SVDRP Response: %s', svdrp_response)
+
+    def send_programme(self, prg, epg_channels, current_channel_id, svdrp):
+        """
+        Send programme EPG entry to VDR for every provided channels entries during EPG upload
+        :return: VDR channel ID of the last sent entry
+        """
+        for channel_entry in epg_channels:
+            vdr_channel_id = channel_entry['id']
+            vdr_channel_name = channel_entry['name']
+            if current_channel_id is None or current_channel_id != vdr_channel_id:
+                if current_channel_id is not None:
+                    #finish previous channel entries
+                    svdrp.send('c')
+                #start new channel
+                svdrp.send('C %s %s' % (vdr_channel_id, vdr_channel_name))
+                current_channel_id = vdr_channel_id
+            #start EPG entry
+            svdrp.send('E %(event_id)s %(start_time)d %(duration)d' % {
+                'event_id': prg['start_timestamp'],
+                'start_time': prg['start_timestamp'],
+                'duration': prg['stop_timestamp']-prg['start_timestamp']
+            })
+            if 'title' in prg:
+                svdrp.send('T %s' % prg['title'][0][0].replace('\\n', '|'))
+            if 'sub-title' in prg:
+                svdrp.send('S %s' % prg['sub-title'][0][0].replace('\\n', '|'))
+            if 'desc' in prg:
+                svdrp.send('D %s' % prg['desc'][0][0].replace('\\n', '|'))
+            #end entry
+            svdrp.send('e')
+        return current_channel_id
+
+    def process_tv_schedule(self, channels_map, svdrp, channel_names=None):
         """
         Process XMLTV tree and upload EPG to VDR
+        :param channel_names: upload EPG only for given loaded channels (default: all loaded channels)
         """
+        if channel_names is None:
+            channel_names = self.get_loaded_channels()
         timestamp_utc_now = get_timestamp_utc_now()
         svdrp.start_conversation()
-        for channel_name in self.get_loaded_channels():
+        for channel_name in channel_names:
             epg_channels = channels_map[channel_name]
             self.logger.info("Load <%s> to %s", channel_name, epg_channels)
             current_channel_id = None
             self.send_clear_channel_epg(epg_channels, svdrp)
-            self.logger.info('Start EPG upload')
-            svdrp_response = svdrp.send_command('PUTE')
-            self.logger.debug('SVDRP Response: %s', svdrp_response)
+            self.start_epg_upload(svdrp)
             for prg in self.get_tv_schedule(channel_name):
                 if prg['stop_timestamp'] < timestamp_utc_now:
                     #skip old entry
                     continue
-                for channel_entry in epg_channels:
-                    vdr_channel_id = channel_entry['id']
-                    vdr_channel_name = channel_entry['name']
-                    if current_channel_id is None or current_channel_id != vdr_channel_id:
-                        if current_channel_id is not None:
-                            #finish previous channel entries
-                            svdrp.send('c')
-                        #start new channel
-                        svdrp.send('C %s %s' % (vdr_channel_id, vdr_channel_name))
-                        current_channel_id = vdr_channel_id
-                    #start EPG entry
-                    svdrp.send('E %(event_id)s %(start_time)d %(duration)d' % {
-                        'event_id': prg['start_timestamp'],
-                        'start_time': prg['start_timestamp'],
-                        'duration': prg['stop_timestamp']-prg['start_timestamp']
-                    })
-                    if 'title' in prg:
-                        svdrp.send('T %s' % prg['title'][0][0].replace('\\n', '|'))
-                    if 'sub-title' in prg:
-                        svdrp.send('S %s' % prg['sub-title'][0][0].replace('\\n', '|'))
-                    if 'desc' in prg:
-                        svdrp.send('D %s' % prg['desc'][0][0].replace('\\n', '|'))
-                    #end entry
-                    svdrp.send('e')
-            else:
-                if current_channel_id is not None:
-                    svdrp.send('c')
-                svdrp_response = svdrp.send_command('.')
-                self.check_upload_result(svdrp_response)
-                self.logger.debug('SVDRP Response: %s', svdrp_response)
+                current_channel_id = self.send_programme(prg, epg_channels, current_channel_id, svdrp)
+            self.finish_epg_upload(current_channel_id, svdrp)
+        self.logger.debug('Finish conversation with VDR')
+        svdrp_response = svdrp.finish_conversation()
+        self.logger.debug('SVDRP Response: %s', svdrp_response)
+
+    def process_tv_stream(self, programmes, channels_map, svdrp):
+        """
+        Upload EPG to VDR from programmes stream without building XMLTV tree.
+        Channel EPG is cleared right before the first channel programme upload.
+        :param programmes: iterable of programme dictionaries (see parse_programme)
+        """
+        timestamp_utc_now = get_timestamp_utc_now()
+        svdrp.start_conversation()
+        cleared_channels = set()
+        upload_started = False
+        current_channel_id = None
+        for prg in programmes:
+            channel_name = prg['channel']
+            epg_channels = channels_map[channel_name]
+            if channel_name not in cleared_channels:
+                if upload_started:
+                    #VDR doesn't accept commands during upload, so finish it before clearing
+                    self.finish_epg_upload(current_channel_id, svdrp)
+                    upload_started = False
+                    current_channel_id = None
+                self.logger.info("Load <%s> to %s", channel_name, epg_channels)
+                self.send_clear_channel_epg(epg_channels, svdrp)
+                cleared_channels.add(channel_name)
+            if prg['stop_timestamp'] < timestamp_utc_now:
+                #skip old entry
+                continue
+            if not upload_started:
+                self.start_epg_upload(svdrp)
+                upload_started = True
+            current_channel_id = self.send_programme(prg, epg_channels, current_channel_id, svdrp)
+        if upload_started:
+            self.finish_epg_upload(current_channel_id, svdrp)
         self.logger.debug('Finish conversation with VDR')
         svdrp_response = svdrp.finish_conversation()
         self.logger.debug('SVDRP Response: %s', svdrp_response)
@@ -0,0 +1,150 @@
+# -*- coding: utf8 -*-
+"""
+Streaming merge of several XMLTV feeds with per-channel feed priority
+"""
+import array
+import heapq
+import logging
+import os
+from zvdrtools.epg.xmltvhelper import XMLTV
+from zvdrtools.pipeline import bounded_iter, checked_iter, SpoolFile
+
+PRIORITY_SECTION = 'Priorities'
+#max programmes count read ahead from every feed
+FEED_QUEUE_SIZE = 500
+logger = logging.getLogger(__name__)
+
+
+def read_xmltv_feeds_priorities(xmltv_channels_map_config, xmltv_filenames):
+    """
+    Read per-channel feeds priority from channels-map.ini file.
+    Priorities section options are XMLTV channels ID with comma separated feed file names (without path)
+    in descending priority order. Feeds missed in the list (and all feeds for not listed channels)
+    follow in the given xmltv_filenames order.
+    :return: function(<XMLTV_ID>, <feed index>) -> feed priority (lower value wins)
+    """
+    import ConfigParser
+    config = ConfigParser.ConfigParser()
+    #XMLTV IDs are case sensitive
+    config.optionxform = str
+    config.read(xmltv_channels_map_config)
+
+    feeds_count = len(xmltv_filenames)
+    feeds_index = dict((os.path.basename(filename), feed_index) for feed_index, filename in enumerate(xmltv_filenames))
+    channels_priorities = {}
+    if config.has_section(PRIORITY_SECTION):
+        for opt in config.options(PRIORITY_SECTION):
+            priorities = {}
+            for feed_name in config.get(PRIORITY_SECTION, opt).split(','):
+                feed_name = feed_name.strip()
+                if feed_name in feeds_index:
+                    priorities.setdefault(feeds_index[feed_name], len(priorities) - feeds_count)
+                elif feed_name:
+                    logger.warning('Unknown feed <%s> in priority rule <%s>', feed_name, opt)
+            channels_priorities[opt] = priorities
+
+    def get_priority(channel_name, feed_index):
+        if channel_name in channels_priorities:
+            return channels_priorities[channel_name].get(feed_index, feed_index)
+        return feed_index
+    return get_priority
+
+
+def merge_tv_schedules(schedules, get_priority):
+    """
+    Merge programmes streams of several XMLTV feeds in start time order.
+    Overlapped programmes of the same channel are resolved by feed priority: programme of the lower priority feed
+    is dropped. Only overlapping window of every channel is kept in memory.
+    :param schedules: list of programme dictionaries iterators, each one should be sorted by start time
+    :param get_priority: function(<XMLTV_ID>, <feed index>) -> feed priority (lower value wins)
+    :return: generator of programme dictionaries
+    """
+    def decorate(feed_index, schedule):
+        for seq, prg in enumerate(schedule):
+            yield prg['start_timestamp'], feed_index, seq, prg
+
+    #{<XMLTV_ID>: [(<priority>, <programme>), ...]} - not yet emitted programmes in start time order
+    windows = {}
+    for start, feed_index, seq, prg in heapq.merge(*[decorate(feed_index, schedule)
+                                                      for feed_index, schedule in enumerate(schedules)]):
+        channel_name = prg['channel']
+        window = windows.setdefault(channel_name, [])
+        #programmes finished before the current one start can't be overlapped anymore
+        while window and window[0][1]['stop_timestamp'] <= start:
+            yield window.pop(0)[1]
+        priority = get_priority(channel_name, feed_index)
+        overlapped = [(item_priority, item) for item_priority, item in window
+                      if item['start_timestamp'] < prg['stop_timestamp'] and start < item['stop_timestamp']]
+        if any(item_priority < priority for item_priority, item in overlapped):
+            logger.debug('Drop overlapped programme %s', prg)
+            continue
+        dropped = [id(item) for item_priority, item in overlapped if item_priority > priority]
+        if dropped:
+            logger.debug('Drop %d overlapped programmes of <%s>', len(dropped), channel_name)
+            window[:] = [(item_priority, item) for item_priority, item in window if id(item) not in dropped]
+        window.append((priority, prg))
+    for window in windows.itervalues():
+        for priority, prg in window:
+            yield prg
+
+
+def iter_spooled_programmes(spool, starts, offsets):
+    """
+    Read spooled programmes in start time order
+    """
+    for index in sorted(xrange(len(offsets)), key=starts.__getitem__):
+        yield spool.read(offsets[index])
+
+
+def merge_tv_schedules_by_channel(schedules, get_priority, spool_dir=None):
+    """
+    Merge programmes streams of several XMLTV feeds channel by channel, feeds may have any programmes order
+    (sorted by start time, grouped by channel in any channels order). Feeds are read one by one and programmes
+    are spooled to a temporary file, only their start times and offsets are kept in memory. When all feeds are
+    read, every channel programmes are read back from the spool in start time order and merged by merge_tv_schedules.
+    :param schedules: list of programme dictionaries iterators
+    :param get_priority: function(<XMLTV_ID>, <feed index>) -> feed priority (lower value wins)
+    :param spool_dir: temporary file directory (default: system temporary directory)
+    :return: generator of programme dictionaries grouped by channel, sorted by start time within a channel
+    """
+    feeds_count = len(schedules)
+    spool = SpoolFile(spool_dir)
+    try:
+        #{<XMLTV_ID>: [(array(<start timestamp>, ...), array(<spool offset>, ...)) for every feed]}
+        channels_runs = {}
+        for feed_index, schedule in enumerate(schedules):
+            for prg in schedule:
+                channel_name = prg['channel']
+                if channel_name not in channels_runs:
+                    channels_runs[channel_name] = [(array.array('l'), array.array('L')) for i in range(feeds_count)]
+                starts, offsets = channels_runs[channel_name][feed_index]
+                starts.append(prg['start_timestamp'])
+                offsets.append(spool.append(prg))
+        for channel_name in sorted(channels_runs):
+            runs = [iter_spooled_programmes(spool, starts, offsets)
+                    for starts, offsets in channels_runs.pop(channel_name)]
+            for prg in merge_tv_schedules(runs, get_priority):
+                yield prg
+    finally:
+        spool.close()
+
+
+def process_xmltv_feeds(xmltv_filenames, channels_map, svdrp, get_priority, memory_budget=None):
+    """
+    Merge given XMLTV files channel by channel and upload EPG to VDR
+    :param memory_budget: MemoryBudget object. If provided every feed is read and decoded in a separate thread
+                          feeding a bounded queue, feed reading is throttled when the budget is approached.
+                          MemoryBudgetExceeded is raised if the budget is exceeded anyway.
+    """
+    xmltv_handler = XMLTV()
+    schedules = [xmltv_handler.iter_tv_schedule_file(filename, channels_map) for filename in xmltv_filenames]
+    if memory_budget is not None:
+        schedules = [bounded_iter(schedule, FEED_QUEUE_SIZE, memory_budget, os.path.basename(filename))
+                     for filename, schedule in zip(xmltv_filenames, schedules)]
+    if len(schedules) == 1:
+        programmes = schedules[0]
+    else:
+        programmes = merge_tv_schedules_by_channel(schedules, get_priority)
+    if memory_budget is not None:
+        programmes = checked_iter(programmes, memory_budget)
+    xmltv_handler.process_tv_stream(programmes, channels_map, svdrp)
@@ -0,0 +1,185 @@
+# -*- coding: utf8 -*-
+"""
+Bounded memory pipeline routines
+"""
+import logging
+import os
+import Queue
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+#part of memory budget when producers are throttled
+MEMORY_HIGH_WATERMARK = 0.9
+#producer checks memory usage every given items count
+MEMORY_CHECK_INTERVAL = 100
+#throttled producer checks queue every given seconds
+THROTTLE_SLEEP = 0.05
+#blocked producer checks the consumer is still alive every given seconds
+PUT_TIMEOUT = 0.5
+
+
+def get_current_rss():
+    """
+    Return current process resident set size in bytes (Linux only), or None if it is not available
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def get_peak_rss():
+    """
+    Return peak process resident set size in bytes
+    """
+    import resource
+    #Linux reports ru_maxrss in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+class MemoryBudget(object):
+    """
+    Process memory usage budget. Producers are throttled when memory usage is close to the budget (is_exceeded),
+    consumers fail when the budget is exceeded (check).
+    """
+    def __init__(self, max_rss):
+        """
+        :param max_rss: memory budget in bytes
+        """
+        self.max_rss = max_rss
+
+    def is_exceeded(self):
+        """
+        Check if current memory usage is close to the budget
+        """
+        return self.get_rss() > self.max_rss * MEMORY_HIGH_WATERMARK
+
+    def get_rss(self):
+        rss = get_current_rss()
+        if rss is None:
+            rss = get_peak_rss()
+        return rss
+
+    def check(self):
+        """
+        Raise MemoryBudgetExceeded if current memory usage is over the budget
+        """
+        rss = self.get_rss()
+        if rss > self.max_rss:
+            raise MemoryBudgetExceeded('Memory usage %.1f MB exceeds the budget of %.1f MB'
+                                       % (rss / 1048576.0, self.max_rss / 1048576.0))
+
+
+def checked_iter(iterable, memory_budget):
+    """
+    Pass iterable items checking memory_budget every MEMORY_CHECK_INTERVAL items
+    :return: generator of iterable items
+    """
+    for item_no, item in enumerate(iterable, 1):
+        if item_no % MEMORY_CHECK_INTERVAL == 0:
+            memory_budget.check()
+        yield item
+
+
+class SpoolFile(object):
+    """
+    Temporary file of marshalled records. Only records offsets are kept in memory by the caller.
+    """
+    def __init__(self, spool_dir=None):
+        import tempfile
+        self._file = tempfile.TemporaryFile(prefix='zvdrtools-', dir=spool_dir)
+
+    def append(self, record):
+        """
+        Write record to the end of the file
+        :return: record offset
+        """
+        import marshal
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        marshal.dump(record, self._file)
+        return offset
+
+    def read(self, offset):
+        import marshal
+        self._file.seek(offset)
+        return marshal.load(self._file)
+
+    def close(self):
+        self._file.close()
+
+
+class _PipelineEnd(object):
+    def __init__(self, exc_info=None):
+        self.exc_info = exc_info
+
+
+def bounded_iter(iterable, max_size, memory_budget=None, name=None):
+    """
+    Run iterable in a separate producer thread and pass its items through a bounded queue.
+    Producer is blocked when the queue is full, and if memory_budget is close to be exceeded
+    it waits for the queue to drain before producing more items.
+    Producer exceptions are raised in the consuming thread, consumer fails with MemoryBudgetExceeded
+    if memory_budget is exceeded in spite of throttling. If the consumer stops early
+    (generator is closed or collected) the producer is stopped and iterable is closed.
+    :return: generator of iterable items
+    """
+    items = Queue.Queue(max_size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item_no, item in enumerate(iterable, 1):
+                if memory_budget is not None and item_no % MEMORY_CHECK_INTERVAL == 0 \
+                        and memory_budget.is_exceeded():
+                    logger.debug('Memory budget is close to be exceeded, throttle <%s>', name)
+                    while not items.empty() and not stopped.is_set():
+                        time.sleep(THROTTLE_SLEEP)
+                if not put(item):
+                    logger.debug('Consumer is gone, stop <%s>', name)
+                    break
+        except Exception:
+            put(_PipelineEnd(sys.exc_info()))
+        else:
+            put(_PipelineEnd())
+        finally:
+            #release source file and parser
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name=name)
+    #stopped producer exits on its next put, don't wait for it at the process exit
+    producer.daemon = True
+    producer.start()
+    try:
+        item_no = 0
+        while True:
+            item = items.get()
+            if isinstance(item, _PipelineEnd):
+                if item.exc_info is not None:
+                    raise item.exc_info[0], item.exc_info[1], item.exc_info[2]
+                break
+            item_no += 1
+            if memory_budget is not None and item_no % MEMORY_CHECK_INTERVAL == 0:
+                memory_budget.check()
+            yield item
+    finally:
+        stopped.set()
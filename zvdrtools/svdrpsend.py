@@ -16,7 +16,10 @@ class SVDRPException(Exception):
 
 class SVDRP(object):
     """Base class for network communication with VDR with the Simple VDR Protocol (SVDRP)"""
-    def __init__(self, hostname='localhost', port=6419, timeout=10, debug_dump=None):
+    def __init__(self, hostname='localhost', port=6419, timeout=10, debug_dump=None, keep_response=True):
+        """
+        :param keep_response: keep all responses of the conversation, otherwise only the last one is kept
+        """
         self.logger = logging.getLogger(__name__)
         self.hostname = hostname
         self.port = port
@@ -25,6 +28,7 @@ class SVDRP(object):
         self.timeout = timeout
         self.response = []
         self.debug_dump = debug_dump
+        self.keep_response = keep_response
         response_pat = r'^(\d+)(\s|-)(.+)$'
         self.response_re = re.compile(response_pat)
 
@@ -78,6 +82,8 @@ class SVDRP(object):
         if self.debug_dump is not None:
             self.logger.warning('Debug dry mode - return empty response')
             return []
+        if not self.keep_response:
+            self.response = []
         next_index = len(self.response)
         for rline in self.sfile:
             self.logger.debug('Got line %s.', repr(rline))
@@ -95,10 +101,10 @@ class SVDRP(object):
         return self.response
 
 
-if __name__ == '__main__':
+def main(args=None, prog=None):
     from optparse import OptionParser
     usage = "usage: %prog [options] command..."
-    parser = OptionParser(usage)
+    parser = OptionParser(usage, prog=prog)
     parser.add_option("-d", "--host", action="store", type="string", dest="hostname", default='localhost',
                       help="destination hostname (default: localhost)")
     parser.add_option("-p", "--port", action="store", type="int", dest="port", default=6419,
@@ -108,7 +114,7 @@ if __name__ == '__main__':
     parser.add_option("-t", "--debug-dump", action="store", type="string", dest="debug_dump",
                       help="Debug dry mode - dump all commands to file, no actual commands send to host")
 
-    (options, args) = parser.parse_args()
+    (options, args) = parser.parse_args(args)
     if len(args) == 0:
         parser.error("missing command")
     if options.verbose:
@@ -124,3 +130,7 @@ if __name__ == '__main__':
     cmd_result = svdrp.get_full_response()
     for resp_line in cmd_result:
         print '%s%s%s' % (resp_line.code, resp_line.delim, resp_line.text)
+
+
+if __name__ == '__main__':
+    main()
@@ -119,6 +119,15 @@ def get_vdr_channels_custom_dict(channels_conf_reader, dict_key_func, dict_value
         logger.debug('%s => %s', dict_key, dict_value)
     return channels_dict
 
+
+def get_vdr_channels_list(channels_conf_reader):
+    """
+    Build VDR channels list (bouquet lines are skipped)
+    :param channels_conf_reader: channel.conf lines list iterator
+    :return: list of Channel namedtuples
+    """
+    return [extract_channel_data(line) for (line_no, line) in channels_conf_reader() if not line.startswith(':')]
+
 def net_get_channel_list(hostname='localhost', port=6419, timeout=10):
     """
     Get VDR channel conf list with Simple VDR Protocol (SVDRP)